@@ -2,48 +2,30 @@
 import socket
 import sys
 import time
-import threading
 import struct
-import random
+import bisect
+import heapq
+import logging
+import os
+import selectors
 
 
+logger = logging.getLogger(__name__)
 
-def CalculateChecksum(data):
-    
-    checksum = 0
-    for i in range(0, len(data), 2):
-        if i + 1 < len(data):
-            word = (data[i] << 8) + data[i + 1]
-        else:
-            word = (data[i] << 8)
-        checksum += word
-        while checksum >> 16:
-            checksum = (checksum & 0xFFFF) + (checksum >> 16)
-    return (~checksum) & 0xFFFF
+_HEADER = struct.Struct('>HHH')
+_FLAG_TYPES = (0, 1, 2, 1, 3, 1, 2, 1)
+_SEGMENT_TYPE_NAMES = ('DATA', 'ACK', 'SYN', 'FIN')
 
 
-def CreateSegment(seq_num, segment_type, payload=b''):
-    
-    seq_bytes = struct.pack('>H', seq_num)
-    
-    flags = 0
-    if segment_type == 1:
-        flags = 0x2000
-    elif segment_type == 2:
-        flags = 0x4000
-    elif segment_type == 3:
-        flags = 0x8000
-    
-    flags_bytes = struct.pack('>H', flags)
+def SumWords(data, initial=0):
     
-    temp_segment = seq_bytes + flags_bytes + b'\x00\x00' + payload
-    
-    checksum = CalculateChecksum(temp_segment)
-    checksum_bytes = struct.pack('>H', checksum)
-    
-    segment_data = seq_bytes + flags_bytes + checksum_bytes + payload
-    
-    return segment_data
+    total = int.from_bytes(data, 'big')
+    if len(data) & 1:
+        total <<= 8
+    total += initial
+    if total:
+        total = total % 0xFFFF or 0xFFFF
+    return total
 
 
 def ParseSegment(segment_data):
@@ -51,39 +33,21 @@ def ParseSegment(segment_data):
     if len(segment_data) < 6:
         return None
     
-    seq_num = struct.unpack('>H', segment_data[0:2])[0]
-    flags_field = struct.unpack('>H', segment_data[2:4])[0]
-    received_checksum = struct.unpack('>H', segment_data[4:6])[0]
+    seq_num, flags_field, received_checksum = _HEADER.unpack_from(segment_data)
     
     payload = segment_data[6:]
     
-    if flags_field & 0x2000:
-        segment_type = 1
-    elif flags_field & 0x4000:
-        segment_type = 2
-    elif flags_field & 0x8000:
-        segment_type = 3
-    else:
-        segment_type = 0
-    
-    temp_segment = segment_data[0:4] + b'\x00\x00' + payload
-    calculated_checksum = CalculateChecksum(temp_segment)
+    segment_type = _FLAG_TYPES[flags_field >> 13]
     
-    is_valid = (calculated_checksum == received_checksum)
+    is_valid = (SumWords(segment_data) == 0xFFFF)
     
     return (seq_num, segment_type, payload, is_valid)
 
 
 def GetSegmentTypeName(segment_type):
     
-    if segment_type == 0:
-        return "DATA"
-    elif segment_type == 1:
-        return "ACK"
-    elif segment_type == 2:
-        return "SYN"
-    elif segment_type == 3:
-        return "FIN"
+    if 0 <= segment_type < 4:
+        return _SEGMENT_TYPE_NAMES[segment_type]
     return "UNKNOWN"
 
 
@@ -99,79 +63,95 @@ class UrpReceiver:
         
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.bind(('localhost', receiver_port))
-        self.sock.settimeout(0.1)
+        self.sock.setblocking(False)
+        self.sender_addr = ('127.0.0.1', sender_port)
+        
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        
+        self.ack_segment = bytearray(6)
+        self.recv_buffer = bytearray(2048)
+        self.recv_view = memoryview(self.recv_buffer)
         
         self.state = 0
         self.expected_seq = None
         self.isn = None
         
-        self.buffer = {}
-        self.received_bytes = set()
+        self.buffer = []
+        self.received_intervals = []
         
         self.file = None
         
         self.log_entries = []
-        self.start_time = None
+        self.start_ns = None
+        self.now_ns = 0
         
-        self.stats = {
-            'original_data_received': 0,
-            'total_data_received': 0,
-            'original_segments_received': 0,
-            'total_segments_received': 0,
-            'corrupted_segments_discarded': 0,
-            'duplicate_segments_received': 0,
-            'total_acks_sent': 0,
-            'duplicate_acks_sent': 0
-        }
+        self.original_data_received = 0
+        self.total_data_received = 0
+        self.original_segments_received = 0
+        self.total_segments_received = 0
+        self.corrupted_segments_discarded = 0
+        self.duplicate_segments_received = 0
+        self.total_acks_sent = 0
+        self.duplicate_acks_sent = 0
     
     def Log(self, direction, status, segment_type, seq_num, payload_len):
         
-        if self.start_time is None:
+        if self.start_ns is None:
             return
-        elapsed = (time.time() - self.start_time) * 1000
-        type_name = GetSegmentTypeName(segment_type)
-        self.log_entries.append(
-            f"{direction}  {status:3s}  {elapsed:7.2f}  {type_name:4s}  {seq_num:5d}  {payload_len:5d}\n"
-        )
+        elapsed = self.now_ns - self.start_ns
+        self.log_entries.append((direction, status, elapsed, segment_type, seq_num, payload_len))
     
     def SendAck(self, ack_num):
         
-        seg = CreateSegment(ack_num, 1)
+        checksum = ack_num + 0x2000
+        checksum = (~((checksum & 0xFFFF) + (checksum >> 16))) & 0xFFFF
+        seg = self.ack_segment
+        _HEADER.pack_into(seg, 0, ack_num, 0x2000, checksum)
         try:
-            print(f"Sending ACK: ack_num={ack_num}, to port {self.sender_port}, segment_size={len(seg)}")
-            self.sock.sendto(seg, ('localhost', self.sender_port))
+            logger.debug("Sending ACK: ack_num=%d, to port %d, segment_size=%d", ack_num, self.sender_port, len(seg))
+            self.sock.sendto(seg, self.sender_addr)
             self.Log('snd', 'ok', 1, ack_num, 0)
-            self.stats['total_acks_sent'] += 1
-            print(f"ACK sent successfully to localhost:{self.sender_port}")
-        except Exception as e:
-            print(f"Error sending ACK: {e}")
-            import traceback
-            traceback.print_exc()
+            self.total_acks_sent += 1
+            logger.debug("ACK sent successfully to localhost:%d", self.sender_port)
+        except BlockingIOError:
+            logger.debug("Send buffer full, dropping ACK %d", ack_num)
+            return False
+        return True
     
     def IsDuplicate(self, seq_num, payload_len):
         
-        for i in range(seq_num, seq_num + payload_len):
-            if i in self.received_bytes:
-                return True
-        return False
+        if payload_len <= 0:
+            return False
+        idx = bisect.bisect_left(self.received_intervals, (seq_num + payload_len,))
+        return idx > 0 and self.received_intervals[idx - 1][1] > seq_num
     
     def MarkReceived(self, seq_num, payload_len):
         
-        for i in range(seq_num, seq_num + payload_len):
-            self.received_bytes.add(i)
+        if payload_len <= 0:
+            return
+        start = seq_num
+        end = seq_num + payload_len
+        lo = bisect.bisect_left(self.received_intervals, (start,))
+        if lo > 0 and self.received_intervals[lo - 1][1] >= start:
+            lo -= 1
+            start = self.received_intervals[lo][0]
+        hi = lo
+        while hi < len(self.received_intervals) and self.received_intervals[hi][0] <= end:
+            end = max(end, self.received_intervals[hi][1])
+            hi += 1
+        self.received_intervals[lo:hi] = [(start, end)]
     
     def WriteContinuousData(self):
         
-        while self.expected_seq in self.buffer:
-            payload = self.buffer[self.expected_seq]
-            del self.buffer[self.expected_seq]
+        while self.buffer and self.buffer[0][0] == self.expected_seq:
+            _, payload = heapq.heappop(self.buffer)
             
             if self.file:
                 self.file.write(payload)
-                self.file.flush()
             
-            self.stats['original_data_received'] += len(payload)
-            self.stats['original_segments_received'] += 1
+            self.original_data_received += len(payload)
+            self.original_segments_received += 1
             
             self.expected_seq += len(payload)
     
@@ -179,12 +159,15 @@ class UrpReceiver:
         
         payload_len = len(payload)
         
-        is_dup = self.IsDuplicate(seq_num, payload_len)
+        if seq_num >= self.expected_seq and not self.buffer:
+            is_dup = False
+        else:
+            is_dup = self.IsDuplicate(seq_num, payload_len)
         
         if is_dup:
-            self.stats['duplicate_segments_received'] += 1
-            self.SendAck(self.expected_seq)
-            self.stats['duplicate_acks_sent'] += 1
+            self.duplicate_segments_received += 1
+            if self.SendAck(self.expected_seq):
+                self.duplicate_acks_sent += 1
             return
         
         self.MarkReceived(seq_num, payload_len)
@@ -192,14 +175,13 @@ class UrpReceiver:
         if seq_num == self.expected_seq:
             if self.file:
                 self.file.write(payload)
-                self.file.flush()
             
-            self.stats['original_data_received'] += len(payload)
-            self.stats['total_data_received'] += len(payload)
-            self.stats['original_segments_received'] += 1
-            self.stats['total_segments_received'] += 1
+            self.original_data_received += payload_len
+            self.total_data_received += payload_len
+            self.original_segments_received += 1
+            self.total_segments_received += 1
             
-            print(f"Received in-order DATA: seq={seq_num}, len={len(payload)}, expected_seq={self.expected_seq}")
+            logger.debug("Received in-order DATA: seq=%d, len=%d, expected_seq=%d", seq_num, payload_len, self.expected_seq)
             
             self.expected_seq += payload_len
             
@@ -208,25 +190,28 @@ class UrpReceiver:
             self.WriteContinuousData()
         else:
             if seq_num > self.expected_seq:
-                print(f"Received out-of-order DATA: seq={seq_num}, expected_seq={self.expected_seq}, buffering...")
-                self.buffer[seq_num] = payload
-                self.stats['total_data_received'] += len(payload)
-                self.stats['total_segments_received'] += 1
-            self.SendAck(self.expected_seq)
-            self.stats['duplicate_acks_sent'] += 1
+                logger.debug("Received out-of-order DATA: seq=%d, expected_seq=%d, buffering...", seq_num, self.expected_seq)
+                heapq.heappush(self.buffer, (seq_num, bytes(payload)))
+                self.total_data_received += len(payload)
+                self.total_segments_received += 1
+            if self.SendAck(self.expected_seq):
+                self.duplicate_acks_sent += 1
     
     def Run(self):
         
         try:
-            self.file = open(self.output_filename, 'wb')
+            self.file = open(self.output_filename, 'wb', buffering=1 << 20)
         except Exception as e:
             return
         
-        print(f"Waiting for SYN...")
+        logger.debug("Waiting for SYN...")
         syn_received = False
         while not syn_received:
             try:
-                data, addr = self.sock.recvfrom(2048)
+                self.selector.select()
+                self.now_ns = time.monotonic_ns()
+                n, addr = self.sock.recvfrom_into(self.recv_buffer)
+                data = self.recv_view[:n]
                 
                 parsed = ParseSegment(data)
                 if not parsed:
@@ -235,51 +220,64 @@ class UrpReceiver:
                 seq_num, seg_type, payload, is_valid = parsed
                 
                 if not is_valid:
-                    print(f"Received corrupted SYN, discarding...")
-                    self.stats['corrupted_segments_discarded'] += 1
+                    logger.debug("Received corrupted SYN, discarding...")
+                    self.corrupted_segments_discarded += 1
                     self.Log('rcv', 'cor', seg_type, seq_num, 0)
                     continue
                 
                 if seg_type == 2:
                     if self.isn is not None and seq_num == self.isn:
-                        print(f"Received duplicate SYN, resending ACK...")
+                        logger.debug("Received duplicate SYN, resending ACK...")
                         self.SendAck(self.expected_seq)
                     else:
-                        print(f"Received SYN: ISN={seq_num}, sending ACK...")
+                        logger.debug("Received SYN: ISN=%d, sending ACK...", seq_num)
                         self.isn = seq_num
                         self.expected_seq = seq_num + 1
                         self.state = 1
                         syn_received = True
-                        self.start_time = time.time()
+                        self.start_ns = self.now_ns
                         
                         self.Log('rcv', 'ok', 2, seq_num, 0)
                         
                         self.SendAck(self.expected_seq)
-                        print(f"Connection established! Waiting for data...")
+                        logger.debug("Connection established! Waiting for data...")
                     break
             
-            except socket.timeout:
+            except BlockingIOError:
                 continue
-            except Exception as e:
-                return
         
         fin_received = False
         fin_ack_num = None
         
+        select = self.selector.select
+        monotonic_ns = time.monotonic_ns
+        recvfrom_into = self.sock.recvfrom_into
+        recv_buffer = self.recv_buffer
+        recv_view = self.recv_view
+        parse_segment = ParseSegment
+        log = self.Log
+        handle_data_segment = self.HandleDataSegment
+        
         while self.state == 1 or self.state == 2:
-            try:
-                data, addr = self.sock.recvfrom(2048)
+            select()
+            self.now_ns = monotonic_ns()
+            for _ in range(64):
+                try:
+                    n, addr = recvfrom_into(recv_buffer)
+                except BlockingIOError:
+                    break
+                data = recv_view[:n]
                 
-                parsed = ParseSegment(data)
+                parsed = parse_segment(data)
                 if not parsed:
                     continue
                 
                 seq_num, seg_type, payload, is_valid = parsed
                 
                 if not is_valid:
-                    print(f"Received corrupted segment: type={seg_type}, seq={seq_num}, discarding...")
-                    self.stats['corrupted_segments_discarded'] += 1
-                    self.Log('rcv', 'cor', seg_type, seq_num, len(payload) if seg_type == 0 else 0)
+                    logger.debug("Received corrupted segment: type=%d, seq=%d, discarding...", seg_type, seq_num)
+                    self.corrupted_segments_discarded += 1
+                    log('rcv', 'cor', seg_type, seq_num, len(payload) if seg_type == 0 else 0)
                     continue
                 
                 if seg_type == 2 and seq_num == self.isn:
@@ -288,73 +286,91 @@ class UrpReceiver:
                 
                 if self.state == 2 and seg_type == 3:
                     if seq_num == fin_ack_num - 1:
-                        print(f"Received retransmitted FIN in TIME_WAIT, resending ACK...")
+                        logger.debug("Received retransmitted FIN in TIME_WAIT, resending ACK...")
                         self.SendAck(fin_ack_num)
                         continue
                 
                 if seg_type == 0:
-                    self.Log('rcv', 'ok', 0, seq_num, len(payload))
+                    log('rcv', 'ok', 0, seq_num, len(payload))
                 elif seg_type == 3:
-                    self.Log('rcv', 'ok', 3, seq_num, 0)
+                    log('rcv', 'ok', 3, seq_num, 0)
                 
                 if seg_type == 0:
                     if self.state == 1:
-                        self.HandleDataSegment(seq_num, payload)
+                        handle_data_segment(seq_num, payload)
                 elif seg_type == 3 and not fin_received:
-                    print(f"Received FIN, sending ACK and entering TIME_WAIT...")
+                    logger.debug("Received FIN, sending ACK and entering TIME_WAIT...")
                     fin_ack_num = seq_num + 1
                     self.SendAck(fin_ack_num)
                     fin_received = True
-                    
+            
                     self.state = 2
-                    print(f"TIME_WAIT (2 seconds)...")
-                    time_wait_start = time.time()
-                    while time.time() - time_wait_start < 2.0:
+                    logger.debug("TIME_WAIT (2 seconds)...")
+                    time_wait_end = time.monotonic() + 2.0
+                    while True:
+                        remaining = time_wait_end - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        if not self.selector.select(remaining):
+                            continue
+                        self.now_ns = time.monotonic_ns()
                         try:
-                            self.sock.settimeout(0.1)
-                            data, addr = self.sock.recvfrom(2048)
-                            parsed = ParseSegment(data)
-                            if parsed:
-                                seq_num, seg_type, payload, is_valid = parsed
-                                if is_valid and seg_type == 3 and seq_num == fin_ack_num - 1:
-                                    print(f"Received retransmitted FIN in TIME_WAIT, resending ACK...")
-                                    self.SendAck(fin_ack_num)
-                                    time_wait_start = time.time()
-                        except socket.timeout:
+                            n, addr = self.sock.recvfrom_into(self.recv_buffer)
+                        except BlockingIOError:
                             continue
-                        except Exception:
-                            break
-                    
+                        parsed = ParseSegment(self.recv_view[:n])
+                        if parsed:
+                            seq_num, seg_type, payload, is_valid = parsed
+                            if is_valid and seg_type == 3 and seq_num == fin_ack_num - 1:
+                                logger.debug("Received retransmitted FIN in TIME_WAIT, resending ACK...")
+                                self.SendAck(fin_ack_num)
+                                time_wait_end = time.monotonic() + 2.0
+            
                     self.state = 0
-                    print(f"Connection closed!")
+                    logger.debug("Connection closed!")
                     break
-            
-            except socket.timeout:
-                continue
-            except Exception as e:
-                break
         
         if self.file:
             self.file.close()
         
+        self.selector.close()
         self.sock.close()
         
         self.WriteLog()
     
+    def CollectStats(self):
+        
+        return {
+            'original_data_received': self.original_data_received,
+            'total_data_received': self.total_data_received,
+            'original_segments_received': self.original_segments_received,
+            'total_segments_received': self.total_segments_received,
+            'corrupted_segments_discarded': self.corrupted_segments_discarded,
+            'duplicate_segments_received': self.duplicate_segments_received,
+            'total_acks_sent': self.total_acks_sent,
+            'duplicate_acks_sent': self.duplicate_acks_sent
+        }
+    
     def WriteLog(self):
         
+        stats = self.CollectStats()
+        
         with open('receiver_log.txt', 'w') as f:
-            for entry in self.log_entries:
-                f.write(entry)
+            f.write(''.join(
+                f"{direction}  {status:3s}  {elapsed / 1e6:7.2f}  {GetSegmentTypeName(segment_type):4s}  {seq_num:5d}  {payload_len:5d}\n"
+                for direction, status, elapsed, segment_type, seq_num, payload_len in self.log_entries
+            ))
             
-            f.write(f"Original data received:         {self.stats['original_data_received']:5d}\n")
-            f.write(f"Total data received:           {self.stats['total_data_received']:5d}\n")
-            f.write(f"Original segments received:    {self.stats['original_segments_received']:5d}\n")
-            f.write(f"Total segments received:       {self.stats['total_segments_received']:5d}\n")
-            f.write(f"Corrupted segments discarded:  {self.stats['corrupted_segments_discarded']:5d}\n")
-            f.write(f"Duplicate segments received:   {self.stats['duplicate_segments_received']:5d}\n")
-            f.write(f"Total acks sent:              {self.stats['total_acks_sent']:5d}\n")
-            f.write(f"Duplicate acks sent:          {self.stats['duplicate_acks_sent']:5d}\n")
+            f.write(''.join((
+                f"Original data received:         {stats['original_data_received']:5d}\n",
+                f"Total data received:           {stats['total_data_received']:5d}\n",
+                f"Original segments received:    {stats['original_segments_received']:5d}\n",
+                f"Total segments received:       {stats['total_segments_received']:5d}\n",
+                f"Corrupted segments discarded:  {stats['corrupted_segments_discarded']:5d}\n",
+                f"Duplicate segments received:   {stats['duplicate_segments_received']:5d}\n",
+                f"Total acks sent:              {stats['total_acks_sent']:5d}\n",
+                f"Duplicate acks sent:          {stats['duplicate_acks_sent']:5d}\n",
+            )))
 
 
 if __name__ == '__main__':
@@ -362,6 +378,8 @@ if __name__ == '__main__':
         print("Usage: python3 receiver.py receiver_port sender_port output_filename max_win")
         sys.exit(1)
     
+    logging.basicConfig(level=os.environ.get('URP_LOG_LEVEL', 'WARNING').upper(), format='%(message)s')
+    
     receiver_port = int(sys.argv[1])
     sender_port = int(sys.argv[2])
     output_filename = sys.argv[3]
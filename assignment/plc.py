@@ -9,7 +9,7 @@ import segment
 class PLC:
     """PLC模块：模拟前向和反向方向的丢包和损坏"""
     
-    def __init__(self, flp, rlp, fcp, rcp):
+    def __init__(self, flp, rlp, fcp, rcp, rng=None):
         """
         初始化PLC模块
         
@@ -18,11 +18,18 @@ class PLC:
             rlp: reverse loss probability (反向丢包概率)
             fcp: forward corruption probability (前向损坏概率)
             rcp: reverse corruption probability (反向损坏概率)
+            rng: 可选的随机数函数，返回[0, 1)之间的浮点数，默认使用random.random
         """
         self.flp = flp
         self.rlp = rlp
         self.fcp = fcp
         self.rcp = rcp
+        
+        # 预先计算损坏判定的阈值，避免每个段重复相加
+        self.forward_threshold = flp + fcp
+        self.reverse_threshold = rlp + rcp
+        # 绑定随机数方法，省去每次调用时的模块属性查找
+        self._random = rng if rng is not None else random.random
     
     def process_forward(self, segment_data):
         """
@@ -32,12 +39,16 @@ class PLC:
             tuple: (processed_segment, status)
             status: 'ok', 'drp', 'cor'
         """
-        rand = random.random()
+        # 概率全为0时无需抽取随机数
+        if not self.forward_threshold:
+            return (segment_data, 'ok')
+        
+        rand = self._random()
         
         if rand < self.flp:
             # 丢包
             return (None, 'drp')
-        elif rand < self.flp + self.fcp:
+        elif rand < self.forward_threshold:
             # 损坏
             corrupted = segment.corrupt_segment(segment_data)
             return (corrupted, 'cor')
@@ -53,12 +64,16 @@ class PLC:
             tuple: (processed_segment, status)
             status: 'ok', 'drp', 'cor'
         """
-        rand = random.random()
+        # 概率全为0时无需抽取随机数
+        if not self.reverse_threshold:
+            return (segment_data, 'ok')
+        
+        rand = self._random()
         
         if rand < self.rlp:
             # 丢包
             return (None, 'drp')
-        elif rand < self.rlp + self.rcp:
+        elif rand < self.reverse_threshold:
             # 损坏
             corrupted = segment.corrupt_segment(segment_data)
             return (corrupted, 'cor')
@@ -19,24 +19,35 @@ FLAG_FIN = 0x8000  # bit 15
 MSS = 1000  # Maximum Segment Size (payload only)
 HEADER_SIZE = 6
 
+# 预编译的header格式：seq, flags, checksum（各16位，大端）
+_HEADER = struct.Struct('>HHH')
+
+# 以flags字段高3位（FIN/SYN/ACK）为下标查段类型，优先级与原来的判断顺序一致：ACK > SYN > FIN
+_FLAG_TO_TYPE = (SEGMENT_DATA, SEGMENT_ACK, SEGMENT_SYN, SEGMENT_ACK,
+                 SEGMENT_FIN, SEGMENT_ACK, SEGMENT_SYN, SEGMENT_ACK)
+
+
+def ones_complement_sum(data):
+    """
+    计算16位字的ones' complement累加和（未取反）
+    """
+    # 整段数据按大端解释为一个整数；因为 2**16 ≡ 1 (mod 0xFFFF)，
+    # 对0xFFFF取模就等于所有16位字带回卷进位的累加和
+    total = int.from_bytes(data, 'big')
+    if len(data) & 1:
+        total <<= 8  # 奇数长度，最后字节补0
+    if total:
+        # 非零的和折叠后不会变成0，余数为0时对应0xFFFF
+        total = total % 0xFFFF or 0xFFFF
+    return total
+
 
 def calculate_checksum(data):
     """
     计算16位ones' complement校验和
     """
-    checksum = 0
-    # 处理所有16位字
-    for i in range(0, len(data), 2):
-        if i + 1 < len(data):
-            word = (data[i] << 8) + data[i + 1]
-        else:
-            word = (data[i] << 8)  # 奇数长度，最后字节补0
-        checksum += word
-        # 处理溢出
-        while checksum >> 16:
-            checksum = (checksum & 0xFFFF) + (checksum >> 16)
     # 取反
-    return (~checksum) & 0xFFFF
+    return (~ones_complement_sum(data)) & 0xFFFF
 
 
 def create_segment(seq_num, segment_type, payload=b''):
@@ -51,8 +62,9 @@ def create_segment(seq_num, segment_type, payload=b''):
     Returns:
         bytes: 编码后的段
     """
-    # 构建header前4字节
-    seq_bytes = struct.pack('>H', seq_num)
+    # DATA段直接交给专用构造函数
+    if segment_type == SEGMENT_DATA:
+        return create_data_segment(seq_num, payload)
     
     # 构建flags字段
     flags = 0
@@ -62,21 +74,56 @@ def create_segment(seq_num, segment_type, payload=b''):
         flags = FLAG_SYN
     elif segment_type == SEGMENT_FIN:
         flags = FLAG_FIN
-    # SEGMENT_DATA: flags = 0
     
-    flags_bytes = struct.pack('>H', flags)
-    
-    # 临时段（不含checksum）
-    temp_segment = seq_bytes + flags_bytes + b'\x00\x00' + payload
-    
-    # 计算校验和
-    checksum = calculate_checksum(temp_segment)
-    checksum_bytes = struct.pack('>H', checksum)
+    if payload:
+        # 控制段正常不带payload，带了就走通用路径
+        return _build_segment(seq_num, flags, payload)
+    return _build_header_segment(seq_num, flags)
+
+
+def create_data_segment(seq_num, payload):
+    """创建DATA段"""
+    return _build_segment(seq_num, 0, payload)
+
+
+def create_ack_segment(seq_num):
+    """创建ACK段（只有6字节header，没有payload）"""
+    return _build_header_segment(seq_num, FLAG_ACK)
+
+
+def create_syn_segment(seq_num):
+    """创建SYN段"""
+    return _build_header_segment(seq_num, FLAG_SYN)
+
+
+def create_fin_segment(seq_num):
+    """创建FIN段"""
+    return _build_header_segment(seq_num, FLAG_FIN)
+
+
+def _build_segment(seq_num, flags, payload):
+    """
+    按给定flags构建带payload的段
+    """
+    # 一次分配整段的缓冲区，header（checksum先填0）和payload直接写进去
+    segment_data = bytearray(HEADER_SIZE + len(payload))
+    _HEADER.pack_into(segment_data, 0, seq_num, flags, 0)
+    segment_data[HEADER_SIZE:] = payload
     
-    # 完整段
-    segment_data = seq_bytes + flags_bytes + checksum_bytes + payload
+    # 计算校验和，直接写回header的checksum字段
+    struct.pack_into('>H', segment_data, 4, calculate_checksum(segment_data))
     
-    return segment_data
+    return bytes(segment_data)
+
+
+def _build_header_segment(seq_num, flags):
+    """
+    按给定flags构建只有header的段（ACK/SYN/FIN）
+    """
+    # header只有seq和flags两个16位字，校验和直接折叠一次进位即可
+    total = seq_num + flags
+    checksum = (~((total & 0xFFFF) + (total >> 16))) & 0xFFFF
+    return _HEADER.pack(seq_num, flags, checksum)
 
 
 def parse_segment(segment_data):
@@ -93,29 +140,18 @@ def parse_segment(segment_data):
         return None
     
     # 解析header
-    seq_num = struct.unpack('>H', segment_data[0:2])[0]
-    flags_field = struct.unpack('>H', segment_data[2:4])[0]
-    received_checksum = struct.unpack('>H', segment_data[4:6])[0]
+    seq_num, flags_field, received_checksum = _HEADER.unpack_from(segment_data)
     
-    # 提取payload
-    payload = segment_data[6:]
+    # 提取payload（memoryview切片，不复制数据；需要长期保存时再转成bytes）
+    payload = memoryview(segment_data)[HEADER_SIZE:]
     
     # 确定段类型
-    if flags_field & FLAG_ACK:
-        segment_type = SEGMENT_ACK
-    elif flags_field & FLAG_SYN:
-        segment_type = SEGMENT_SYN
-    elif flags_field & FLAG_FIN:
-        segment_type = SEGMENT_FIN
-    else:
-        segment_type = SEGMENT_DATA
+    segment_type = _FLAG_TO_TYPE[flags_field >> 13]
     
     # 验证校验和
-    # 将checksum字段置0后计算
-    temp_segment = segment_data[0:4] + b'\x00\x00' + payload
-    calculated_checksum = calculate_checksum(temp_segment)
-    
-    is_valid = (calculated_checksum == received_checksum)
+    # 连同收到的checksum字段一起求和，结果为0xFFFF即校验通过（RFC 1071），
+    # 不需要再拼接一个checksum置0的临时段
+    is_valid = (ones_complement_sum(segment_data) == 0xFFFF)
     
     return (seq_num, segment_type, payload, is_valid)
 
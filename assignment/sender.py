@@ -2,46 +2,41 @@
 import socket
 import sys
 import time
-import threading
 import struct
 import random
+import heapq
+import selectors
+import mmap
+import logging
+import os
 
 
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('>HHH')
+_SEGMENT_FLAGS = (0, 0x2000, 0x4000, 0x8000)
+_FLAG_TYPES = (0, 1, 2, 1, 3, 1, 2, 1)
+_SEGMENT_TYPE_NAMES = ('DATA', 'ACK', 'SYN', 'FIN')
 
-def CalculateChecksum(data):
-    
-    checksum = 0
-    for i in range(0, len(data), 2):
-        if i + 1 < len(data):
-            word = (data[i] << 8) + data[i + 1]
-        else:
-            word = (data[i] << 8)
-        checksum += word
-        while checksum >> 16:
-            checksum = (checksum & 0xFFFF) + (checksum >> 16)
-    return (~checksum) & 0xFFFF
+
+def SumWords(data, initial=0):
+    
+    total = int.from_bytes(data, 'big')
+    if len(data) & 1:
+        total <<= 8
+    total += initial
+    if total:
+        total = total % 0xFFFF or 0xFFFF
+    return total
 
 
 def CreateSegment(seq_num, segment_type, payload=b''):
     
-    seq_bytes = struct.pack('>H', seq_num)
-    
-    flags = 0
-    if segment_type == 1:
-        flags = 0x2000
-    elif segment_type == 2:
-        flags = 0x4000
-    elif segment_type == 3:
-        flags = 0x8000
-    
-    flags_bytes = struct.pack('>H', flags)
+    flags = _SEGMENT_FLAGS[segment_type]
     
-    temp_segment = seq_bytes + flags_bytes + b'\x00\x00' + payload
+    checksum = (~SumWords(payload, seq_num + flags)) & 0xFFFF
     
-    checksum = CalculateChecksum(temp_segment)
-    checksum_bytes = struct.pack('>H', checksum)
-    
-    segment_data = seq_bytes + flags_bytes + checksum_bytes + payload
+    segment_data = _HEADER.pack(seq_num, flags, checksum) + payload
     
     return segment_data
 
@@ -51,25 +46,17 @@ def ParseSegment(segment_data):
     if len(segment_data) < 6:
         return None
     
-    seq_num = struct.unpack('>H', segment_data[0:2])[0]
-    flags_field = struct.unpack('>H', segment_data[2:4])[0]
-    received_checksum = struct.unpack('>H', segment_data[4:6])[0]
+    seq_num, flags_field, received_checksum = _HEADER.unpack_from(segment_data)
     
     payload = segment_data[6:]
     
-    if flags_field & 0x2000:
-        segment_type = 1
-    elif flags_field & 0x4000:
-        segment_type = 2
-    elif flags_field & 0x8000:
-        segment_type = 3
-    else:
-        segment_type = 0
-    
-    temp_segment = segment_data[0:4] + b'\x00\x00' + payload
-    calculated_checksum = CalculateChecksum(temp_segment)
+    segment_type = _FLAG_TYPES[flags_field >> 13]
     
-    is_valid = (calculated_checksum == received_checksum)
+    if len(segment_data) == 6:
+        total = seq_num + flags_field + received_checksum
+        is_valid = ((total & 0xFFFF) + (total >> 16) == 0xFFFF)
+    else:
+        is_valid = (SumWords(segment_data) == 0xFFFF)
     
     return (seq_num, segment_type, payload, is_valid)
 
@@ -90,34 +77,34 @@ def CorruptSegment(segment_data):
 
 def GetSegmentTypeName(segment_type):
     
-    if segment_type == 0:
-        return "DATA"
-    elif segment_type == 1:
-        return "ACK"
-    elif segment_type == 2:
-        return "SYN"
-    elif segment_type == 3:
-        return "FIN"
+    if 0 <= segment_type < 4:
+        return _SEGMENT_TYPE_NAMES[segment_type]
     return "UNKNOWN"
 
 
 class Plc:
     
     
-    def __init__(self, flp, rlp, fcp, rcp):
+    def __init__(self, flp, rlp, fcp, rcp, rng=None):
         
         self.flp = flp
         self.rlp = rlp
         self.fcp = fcp
         self.rcp = rcp
+        self.forward_threshold = flp + fcp
+        self.reverse_threshold = rlp + rcp
+        self._random = rng if rng is not None else random.random
     
     def ProcessForward(self, segment_data):
         
-        rand = random.random()
+        if not self.forward_threshold:
+            return (segment_data, 'ok')
+        
+        rand = self._random()
         
         if rand < self.flp:
             return (None, 'drp')
-        elif rand < self.flp + self.fcp:
+        elif rand < self.forward_threshold:
             corrupted = CorruptSegment(segment_data)
             return (corrupted, 'cor')
         else:
@@ -125,11 +112,14 @@ class Plc:
     
     def ProcessReverse(self, segment_data):
         
-        rand = random.random()
+        if not self.reverse_threshold:
+            return (segment_data, 'ok')
+        
+        rand = self._random()
         
         if rand < self.rlp:
             return (None, 'drp')
-        elif rand < self.rlp + self.rcp:
+        elif rand < self.reverse_threshold:
             corrupted = CorruptSegment(segment_data)
             return (corrupted, 'cor')
         else:
@@ -152,10 +142,19 @@ class UrpSender:
         self.plc = Plc(flp, rlp, fcp, rcp)
         
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        print(f"[Sender] Binding socket to localhost:{sender_port}")
+        logger.debug("[Sender] Binding socket to localhost:%d", sender_port)
         self.sock.bind(('localhost', sender_port))
-        self.sock.settimeout(0.1)
-        print(f"[Sender] Socket bound successfully")
+        buf_size = max(65536, 4 * max_win)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buf_size)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buf_size)
+        logger.debug("[Sender] Socket bound successfully")
+        self.receiver_addr = ('127.0.0.1', receiver_port)
+        
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        
+        self.recv_buffer = bytearray(2048)
+        self.recv_view = memoryview(self.recv_buffer)
         
         self.state = 0
         self.isn = None
@@ -166,19 +165,18 @@ class UrpSender:
         self.unacked_bytes = 0
         
         self.file = None
+        self.file_map = None
+        self.file_view = None
         self.file_size = 0
         self.file_pos = 0
         
-        self.timer = None
-        self.timer_lock = threading.Lock()
-        self.timer_running = False
-        self.oldest_unacked_seq = None
+        self.timer_heap = []
         
-        self.dup_ack_count = {}
+        self.dup_ack_count = 0
         self.last_ack = None
         
         self.log_entries = []
-        self.start_time = None
+        self.start_ns = None
         
         self.stats = {
             'original_data_sent': 0,
@@ -197,35 +195,30 @@ class UrpSender:
     
     def Log(self, direction, status, segment_type, seq_num, payload_len):
         
-        if self.start_time is None:
+        if self.start_ns is None:
             return
-        elapsed = (time.time() - self.start_time) * 1000
-        type_name = GetSegmentTypeName(segment_type)
-        self.log_entries.append(
-            f"{direction}  {status:3s}  {elapsed:7.2f}  {type_name:4s}  {seq_num:5d}  {payload_len:5d}\n"
-        )
+        elapsed = time.monotonic_ns() - self.start_ns
+        self.log_entries.append((direction, status, elapsed, segment_type, seq_num, payload_len))
     
-    def SendSegment(self, seq_num, segment_type, payload=b'', is_retransmission=False):
-        
-        seg = CreateSegment(seq_num, segment_type, payload)
+    def SendRaw(self, seg, segment_type, seq_num, payload_len, is_retransmission=False):
         
         processed_seg, status = self.plc.ProcessForward(seg)
         
         if status == 'drp':
             self.stats['plc_forward_segments_dropped'] += 1
-            self.Log('snd', 'drp', segment_type, seq_num, len(payload))
+            self.Log('snd', 'drp', segment_type, seq_num, payload_len)
             return (False, 'drp')
         
         if processed_seg:
             try:
-                self.sock.sendto(processed_seg, ('localhost', self.receiver_port))
-                self.Log('snd', status, segment_type, seq_num, len(payload))
+                self.sock.sendto(processed_seg, self.receiver_addr)
+                self.Log('snd', status, segment_type, seq_num, payload_len)
                 
                 if segment_type == 0:
                     if not is_retransmission:
-                        self.stats['original_data_sent'] += len(payload)
+                        self.stats['original_data_sent'] += payload_len
                         self.stats['original_segments_sent'] += 1
-                    self.stats['total_data_sent'] += len(payload)
+                    self.stats['total_data_sent'] += payload_len
                     self.stats['total_segments_sent'] += 1
                 else:
                     self.stats['total_segments_sent'] += 1
@@ -239,205 +232,189 @@ class UrpSender:
         
         return (False, 'drp')
     
-    def StartTimer(self, seq_num):
-        
-        with self.timer_lock:
-            if not self.timer_running:
-                self.oldest_unacked_seq = seq_num
-                self.timer_running = True
-                threading.Thread(target=self._TimerThread, daemon=True).start()
-    
-    def StopTimer(self):
-        
-        with self.timer_lock:
-            self.timer_running = False
-    
-    def _TimerThread(self):
-        
-        while self.timer_running:
-            time.sleep(self.rto)
-            with self.timer_lock:
-                if not self.timer_running:
-                    break
-                if self.oldest_unacked_seq is not None and self.oldest_unacked_seq in self.window:
-                    seg_data, payload_len, _ = self.window[self.oldest_unacked_seq]
-                    parsed = ParseSegment(seg_data)
-                    if parsed:
-                        seq_num, seg_type, payload, _ = parsed
-                        print(f"[Sender] Timeout! Retransmitting segment: type={GetSegmentTypeName(seg_type)}, seq={seq_num}")
-                        self.SendSegment(seq_num, seg_type, payload, is_retransmission=True)
-                        self.stats['timeout_retransmissions'] += 1
-                        
-                        self.window[self.oldest_unacked_seq] = (
-                            seg_data, payload_len, time.time()
-                        )
+    def ArmTimer(self, seq_num, sent_at):
+        
+        heapq.heappush(self.timer_heap, (sent_at + self.rto, seq_num))
+    
+    def CheckTimeouts(self):
+        
+        now = time.monotonic()
+        while self.timer_heap and self.timer_heap[0][0] <= now:
+            _, seq_num = heapq.heappop(self.timer_heap)
+            entry = self.window.get(seq_num)
+            if entry is None or entry[4] + self.rto > now or seq_num != next(iter(self.window)):
+                continue
+            seg_data, seg_type, payload_len, end_seq, _ = entry
+            logger.debug("[Sender] Timeout! Retransmitting segment: type=%s, seq=%d", GetSegmentTypeName(seg_type), seq_num)
+            self.SendRaw(seg_data, seg_type, seq_num, payload_len, is_retransmission=True)
+            self.stats['timeout_retransmissions'] += 1
+            
+            self.window[seq_num] = (
+                seg_data, seg_type, payload_len, end_seq, now
+            )
+            self.ArmTimer(seq_num, now)
     
     def HandleAck(self, ack_num):
         
         if ack_num <= self.base:
             if ack_num == self.base:
                 self.stats['duplicate_acks_received'] += 1
-                self.dup_ack_count[ack_num] = self.dup_ack_count.get(ack_num, 0) + 1
-                if self.dup_ack_count[ack_num] == 3:
+                self.dup_ack_count += 1
+                if self.dup_ack_count % 3 == 0:
                     if self.base in self.window:
-                        seg_data, payload_len, _ = self.window[self.base]
-                        parsed = ParseSegment(seg_data)
-                        if parsed:
-                            seq_num, seg_type, payload, _ = parsed
-                            self.SendSegment(seq_num, seg_type, payload, is_retransmission=True)
-                            self.stats['fast_retransmissions'] += 1
-                            self.window[self.base] = (seg_data, payload_len, time.time())
+                        seg_data, seg_type, payload_len, end_seq, _ = self.window[self.base]
+                        self.SendRaw(seg_data, seg_type, self.base, payload_len, is_retransmission=True)
+                        self.stats['fast_retransmissions'] += 1
+                        now = time.monotonic()
+                        self.window[self.base] = (seg_data, seg_type, payload_len, end_seq, now)
+                        self.ArmTimer(self.base, now)
             return
         
-        acked_seqs = []
-        for seq in sorted(self.window.keys()):
-            seg_data, payload_len, _ = self.window[seq]
-            parsed = ParseSegment(seg_data)
-            if parsed:
-                seg_seq, seg_type, _, _ = parsed
-                if seg_type == 0:
-                    end_seq = seg_seq + payload_len
-                else:
-                    end_seq = seg_seq + 1
-                
-                if end_seq <= ack_num:
-                    acked_seqs.append(seq)
-                    if seg_type == 0:
-                        self.unacked_bytes -= payload_len
-        
-        for seq in acked_seqs:
+        acked_count = 0
+        while self.window:
+            seq = next(iter(self.window))
+            _, seg_type, payload_len, end_seq, _ = self.window[seq]
+            if end_seq > ack_num:
+                break
             del self.window[seq]
+            acked_count += 1
+            if seg_type == 0:
+                self.unacked_bytes -= payload_len
         
-        if acked_seqs:
-            print(f"[Sender] Received ACK: {ack_num}, acknowledged {len(acked_seqs)} segments, window_size={len(self.window)}, unacked_bytes={self.unacked_bytes}")
+        if acked_count:
+            logger.debug("[Sender] Received ACK: %d, acknowledged %d segments, window_size=%d, unacked_bytes=%d", ack_num, acked_count, len(self.window), self.unacked_bytes)
             self.base = ack_num
-            self.dup_ack_count.clear()
+            self.dup_ack_count = 0
             if self.window:
-                self.oldest_unacked_seq = min(self.window.keys())
-                if not self.timer_running:
-                    self.StartTimer(self.oldest_unacked_seq)
-            else:
-                self.oldest_unacked_seq = None
-                self.StopTimer()
+                oldest_seq = next(iter(self.window))
+                now = time.monotonic()
+                self.window[oldest_seq] = self.window[oldest_seq][:4] + (now,)
+                self.ArmTimer(oldest_seq, now)
         
         self.last_ack = ack_num
     
-    def ReceiveLoop(self):
+    def ReceiveAck(self):
         
-        print(f"[Sender] Receive loop started, listening on port {self.sender_port}")
-        while self.state != 0:
-            try:
-                data, addr = self.sock.recvfrom(2048)
-                print(f"[Sender] Received UDP packet from {addr}, size={len(data)}")
-                
-                processed_data, status = self.plc.ProcessReverse(data)
-                
-                if status == 'drp':
-                    print(f"[Sender] ACK dropped by PLC (reverse loss)")
-                    self.stats['plc_reverse_segments_dropped'] += 1
-                    continue
-                
-                if not processed_data:
-                    continue
-                
-                if status == 'cor':
-                    print(f"[Sender] ACK corrupted by PLC (reverse corruption)")
-                
-                parsed = ParseSegment(processed_data)
-                if not parsed:
-                    continue
-                
-                seq_num, seg_type, payload, is_valid = parsed
-                
-                if not is_valid:
-                    print(f"[Sender] Received corrupted ACK: seq={seq_num}, discarding...")
-                    self.stats['corrupted_acks_discarded'] += 1
-                    self.Log('rcv', 'cor', seg_type, seq_num, 0)
-                    continue
-                
-                self.Log('rcv', status, seg_type, seq_num, 0)
-                if status == 'cor':
-                    self.stats['plc_reverse_segments_corrupted'] += 1
-                    print(f"[Sender] Received corrupted ACK (after PLC): seq={seq_num}")
+        n, addr = self.sock.recvfrom_into(self.recv_buffer)
+        data = self.recv_view[:n]
+        logger.debug("[Sender] Received UDP packet from %s, size=%d", addr, n)
+        
+        processed_data, status = self.plc.ProcessReverse(data)
+        
+        if status == 'drp':
+            logger.debug("[Sender] ACK dropped by PLC (reverse loss)")
+            self.stats['plc_reverse_segments_dropped'] += 1
+            return
+        
+        if not processed_data:
+            return
+        
+        if status == 'cor':
+            logger.debug("[Sender] ACK corrupted by PLC (reverse corruption)")
+        
+        parsed = ParseSegment(processed_data)
+        if not parsed:
+            return
+        
+        seq_num, seg_type, payload, is_valid = parsed
+        
+        if not is_valid:
+            logger.debug("[Sender] Received corrupted ACK: seq=%d, discarding...", seq_num)
+            self.stats['corrupted_acks_discarded'] += 1
+            self.Log('rcv', 'cor', seg_type, seq_num, 0)
+            return
+        
+        self.Log('rcv', status, seg_type, seq_num, 0)
+        if status == 'cor':
+            self.stats['plc_reverse_segments_corrupted'] += 1
+            logger.debug("[Sender] Received corrupted ACK (after PLC): seq=%d", seq_num)
+        else:
+            logger.debug("[Sender] Received ACK (status=%s): seq=%d, state=%d", status, seq_num, self.state)
+        
+        if seg_type == 1:
+            if self.state == 1:
+                logger.debug("[Sender] Received ACK in SYN_SENT state: seq=%d, expected=%d", seq_num, self.isn + 1)
+                if seq_num == self.isn + 1:
+                    logger.debug("[Sender] Received SYN ACK, connection established!")
+                    self.base = self.isn + 1
+                    self.next_seq = self.isn + 1
+                    self.window.pop(self.isn, None)
+                    self.state = 2
                 else:
-                    print(f"[Sender] Received ACK (status={status}): seq={seq_num}, state={self.state}")
-                
-                if seg_type == 1:
-                    if self.state == 1:
-                        print(f"[Sender] Received ACK in SYN_SENT state: seq={seq_num}, expected={self.isn + 1}")
-                        if seq_num == self.isn + 1:
-                            print(f"[Sender] Received SYN ACK, connection established!")
-                            self.state = 2
-                            self.base = self.isn + 1
-                            self.next_seq = self.isn + 1
-                            self.StopTimer()
-                        else:
-                            print(f"[Sender] ACK seq mismatch: got {seq_num}, expected {self.isn + 1}")
-                    elif self.state == 2:
-                        self.HandleAck(seq_num)
-                    elif self.state == 3:
-                        if seq_num == self.next_seq:
-                            print(f"[Sender] Received FIN ACK, closing connection...")
-                            self.state = 0
-                            self.StopTimer()
-                            break
-            
-            except socket.timeout:
-                continue
-            except Exception as e:
-                print(f"[Sender] Error in receive_loop: {e}")
-                import traceback
-                traceback.print_exc()
-                break
+                    logger.debug("[Sender] ACK seq mismatch: got %d, expected %d", seq_num, self.isn + 1)
+            elif self.state == 2:
+                self.HandleAck(seq_num)
+            elif self.state == 3:
+                if seq_num == self.next_seq:
+                    logger.debug("[Sender] Received FIN ACK, closing connection...")
+                    self.state = 0
     
-    def SendData(self):
-        
-        while self.state == 2:
-            if self.file_pos >= self.file_size and len(self.window) == 0:
-                print(f"[Sender] All data sent and acknowledged, sending FIN...")
-                self.state = 3
-                fin_seq = self.next_seq
-                self.SendSegment(fin_seq, 3)
-                self.window[fin_seq] = (
-                    CreateSegment(fin_seq, 3),
-                    0, time.time()
-                )
-                self.next_seq += 1
-                self.StartTimer(fin_seq)
-                break
+    def FillWindow(self):
+        
+        if self.file_pos >= self.file_size:
+            if self.window:
+                return
+            logger.debug("[Sender] All data sent and acknowledged, sending FIN...")
+            fin_seq = self.next_seq
+            seg = CreateSegment(fin_seq, 3)
+            sent_at = time.monotonic()
+            self.window[fin_seq] = (seg, 3, 0, fin_seq + 1, sent_at)
+            self.next_seq += 1
+            self.state = 3
+            self.SendRaw(seg, 3, fin_seq, 0)
+            self.ArmTimer(fin_seq, sent_at)
+            return
+        
+        available_win = self.max_win - self.unacked_bytes
+        sent_at = time.monotonic()
+        while available_win > 0 and self.file_pos < self.file_size:
+            payload_size = min(1000, available_win, self.file_size - self.file_pos)
+            payload = self.file_view[self.file_pos:self.file_pos + payload_size]
+            seq_num = self.next_seq
+            seg = CreateSegment(seq_num, 0, payload)
+            self.window[seq_num] = (seg, 0, payload_size, seq_num + payload_size, sent_at)
+            self.unacked_bytes += payload_size
+            self.SendRaw(seg, 0, seq_num, payload_size)
+            logger.debug("[Sender] Sent DATA segment: seq=%d, len=%d, file_pos=%d/%d", seq_num, payload_size, self.file_pos, self.file_size)
+            self.ArmTimer(seq_num, sent_at)
             
-            available_win = self.max_win - self.unacked_bytes
+            self.next_seq += payload_size
+            self.file_pos += payload_size
+            available_win -= payload_size
+    
+    def EventLoop(self):
+        
+        max_wait_time = 30
+        deadline = time.monotonic() + max_wait_time
+        while self.state != 0:
+            self.CheckTimeouts()
+            if self.state == 2:
+                self.FillWindow()
+                if self.state == 3:
+                    logger.debug("[Sender] Waiting for FIN ACK...")
+                    deadline = time.monotonic() + max_wait_time
             
-            if available_win > 0 and self.file_pos < self.file_size:
-                payload_size = min(1000, available_win, self.file_size - self.file_pos)
-                
-                if payload_size > 0:
-                    self.file.seek(self.file_pos)
-                    payload = self.file.read(payload_size)
-                    
-                    if len(payload) > 0:
-                        seq_num = self.next_seq
-                        seg = CreateSegment(seq_num, 0, payload)
-                        
-                        self.window[seq_num] = (seg, len(payload), time.time())
-                        self.unacked_bytes += len(payload)
-                        
-                        self.SendSegment(seq_num, 0, payload)
-                        print(f"[Sender] Sent DATA segment: seq={seq_num}, len={len(payload)}, file_pos={self.file_pos}/{self.file_size}")
-                        
-                        self.next_seq += len(payload)
-                        self.file_pos += len(payload)
-                        
-                        if not self.timer_running:
-                            self.StartTimer(seq_num)
-                        elif self.oldest_unacked_seq is None or seq_num < self.oldest_unacked_seq:
-                            self.oldest_unacked_seq = seq_num
-                    else:
-                        break
+            now = time.monotonic()
+            if self.state != 2 and now >= deadline:
+                if self.state == 1:
+                    logger.warning("[Sender] Connection establishment timeout!")
                 else:
-                    time.sleep(0.01)
-            else:
-                time.sleep(0.01)
+                    logger.warning("[Sender] FIN ACK timeout!")
+                return False
+            
+            timeout = deadline - now if self.state != 2 else None
+            if self.timer_heap:
+                timer_timeout = max(0, self.timer_heap[0][0] - now)
+                timeout = timer_timeout if timeout is None else min(timeout, timer_timeout)
+            if not self.selector.select(timeout):
+                continue
+            try:
+                self.ReceiveAck()
+            except Exception:
+                logger.exception("[Sender] Error in event loop")
+                return False
+        
+        return True
     
     def Run(self):
         
@@ -446,58 +423,41 @@ class UrpSender:
             self.file.seek(0, 2)
             self.file_size = self.file.tell()
             self.file.seek(0)
+            if self.file_size > 0:
+                self.file_map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.file_view = memoryview(self.file_map)
         except Exception as e:
             return
         
-        recv_thread = threading.Thread(target=self.ReceiveLoop, daemon=True)
-        recv_thread.start()
-        
         self.state = 1
+        
         self.isn = random.randint(0, 65535)
         self.base = self.isn
         self.next_seq = self.isn
         
-        self.start_time = time.time()
+        self.start_ns = time.monotonic_ns()
         
-        print(f"[Sender] Starting connection, ISN={self.isn}")
-        self.SendSegment(self.isn, 2)
-        self.window[self.isn] = (
-            CreateSegment(self.isn, 2),
-            0, time.time()
-        )
+        logger.debug("[Sender] Starting connection, ISN=%d", self.isn)
+        seg = CreateSegment(self.isn, 2)
+        sent_at = time.monotonic()
+        self.window[self.isn] = (seg, 2, 0, self.isn + 1, sent_at)
         self.next_seq = self.isn + 1
-        self.StartTimer(self.isn)
-        print(f"[Sender] SYN sent, waiting for ACK...")
-        
-        max_wait_time = 30
-        wait_start = time.time()
-        while self.state == 1:
-            if time.time() - wait_start > max_wait_time:
-                print(f"[Sender] Connection establishment timeout!")
-                return
-            time.sleep(0.01)
+        self.SendRaw(seg, 2, self.isn, 0)
+        self.ArmTimer(self.isn, sent_at)
+        logger.debug("[Sender] SYN sent, waiting for ACK...")
         
-        if self.state != 2:
-            print(f"[Sender] Connection not established, state={self.state}")
+        if not self.EventLoop():
             return
         
-        print(f"[Sender] Connection established! Starting data transmission...")
-        self.SendData()
-        
-        print(f"[Sender] Waiting for FIN ACK...")
-        max_wait_time = 30
-        wait_start = time.time()
-        while self.state == 3:
-            if time.time() - wait_start > max_wait_time:
-                print(f"[Sender] FIN ACK timeout!")
-                return
-            time.sleep(0.01)
-        
-        print(f"[Sender] Connection closed successfully!")
+        logger.debug("[Sender] Connection closed successfully!")
         
+        if self.file_map:
+            self.file_view.release()
+            self.file_map.close()
         if self.file:
             self.file.close()
         
+        self.selector.close()
         self.sock.close()
         
         self.WriteLog()
@@ -505,21 +465,25 @@ class UrpSender:
     def WriteLog(self):
         
         with open('sender_log.txt', 'w') as f:
-            for entry in self.log_entries:
-                f.write(entry)
+            f.write(''.join(
+                f"{direction}  {status:3s}  {elapsed / 1e6:7.2f}  {GetSegmentTypeName(segment_type):4s}  {seq_num:5d}  {payload_len:5d}\n"
+                for direction, status, elapsed, segment_type, seq_num, payload_len in self.log_entries
+            ))
             
-            f.write(f"Original data sent:            {self.stats['original_data_sent']:5d}\n")
-            f.write(f"Total data sent:               {self.stats['total_data_sent']:5d}\n")
-            f.write(f"Original segments sent:        {self.stats['original_segments_sent']:5d}\n")
-            f.write(f"Total segments sent:           {self.stats['total_segments_sent']:5d}\n")
-            f.write(f"Timeout retransmissions:       {self.stats['timeout_retransmissions']:5d}\n")
-            f.write(f"Fast retransmissions:          {self.stats['fast_retransmissions']:5d}\n")
-            f.write(f"Duplicate acks received:       {self.stats['duplicate_acks_received']:5d}\n")
-            f.write(f"Corrupted acks discarded:      {self.stats['corrupted_acks_discarded']:5d}\n")
-            f.write(f"PLC forward segments dropped:  {self.stats['plc_forward_segments_dropped']:5d}\n")
-            f.write(f"PLC forward segments corrupted: {self.stats['plc_forward_segments_corrupted']:5d}\n")
-            f.write(f"PLC reverse segments dropped:  {self.stats['plc_reverse_segments_dropped']:5d}\n")
-            f.write(f"PLC reverse segments corrupted: {self.stats['plc_reverse_segments_corrupted']:5d}\n")
+            f.write(''.join((
+                f"Original data sent:            {self.stats['original_data_sent']:5d}\n",
+                f"Total data sent:               {self.stats['total_data_sent']:5d}\n",
+                f"Original segments sent:        {self.stats['original_segments_sent']:5d}\n",
+                f"Total segments sent:           {self.stats['total_segments_sent']:5d}\n",
+                f"Timeout retransmissions:       {self.stats['timeout_retransmissions']:5d}\n",
+                f"Fast retransmissions:          {self.stats['fast_retransmissions']:5d}\n",
+                f"Duplicate acks received:       {self.stats['duplicate_acks_received']:5d}\n",
+                f"Corrupted acks discarded:      {self.stats['corrupted_acks_discarded']:5d}\n",
+                f"PLC forward segments dropped:  {self.stats['plc_forward_segments_dropped']:5d}\n",
+                f"PLC forward segments corrupted: {self.stats['plc_forward_segments_corrupted']:5d}\n",
+                f"PLC reverse segments dropped:  {self.stats['plc_reverse_segments_dropped']:5d}\n",
+                f"PLC reverse segments corrupted: {self.stats['plc_reverse_segments_corrupted']:5d}\n",
+            )))
 
 
 if __name__ == '__main__':
@@ -527,6 +491,8 @@ if __name__ == '__main__':
         print("Usage: python3 sender.py sender_port receiver_port filename max_win rto flp rlp fcp rcp")
         sys.exit(1)
     
+    logging.basicConfig(level=os.environ.get('URP_LOG_LEVEL', 'WARNING').upper(), format='%(message)s')
+    
     sender_port = int(sys.argv[1])
     receiver_port = int(sys.argv[2])
     filename = sys.argv[3]
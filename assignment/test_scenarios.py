@@ -2,60 +2,80 @@
 URP Protocol Test Scenarios
 按照作业要求测试不同场景
 """
-import subprocess
-import time
+import asyncio
 import os
 import sys
 
-def run_test(test_name, receiver_cmd, sender_cmd, wait_time=10):
-    """运行一个测试场景"""
-    print(f"\n{'='*80}")
-    print(f"Test: {test_name}")
-    print(f"{'='*80}")
-    print(f"Receiver: {receiver_cmd}")
-    print(f"Sender: {sender_cmd}")
-    print(f"{'='*80}\n")
+# 脚本所在目录，子进程通过绝对路径启动
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def run_test(test_name, receiver_args, sender_args, wait_time, work_dir):
+    """运行一个测试场景（每个测试在独立的目录中运行，互不干扰，日志保留在该目录）"""
+    os.makedirs(work_dir, exist_ok=True)
+    # 清除上一次运行留下的输出文件，避免误判
+    output_path = os.path.join(work_dir, 'output.txt')
+    if os.path.exists(output_path):
+        os.remove(output_path)
     
     # 启动接收方
-    receiver = subprocess.Popen(
-        receiver_cmd,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+    receiver = await asyncio.create_subprocess_exec(
+        sys.executable, *receiver_args,
+        cwd=work_dir,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
     )
     
     # 等待接收方启动
-    time.sleep(1)
+    await asyncio.sleep(1)
     
     # 启动发送方
-    sender = subprocess.Popen(
-        sender_cmd,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+    sender = await asyncio.create_subprocess_exec(
+        sys.executable, *sender_args,
+        cwd=work_dir,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
     )
     
-    # 等待完成
+    # 等待完成（communicate同时读取管道，避免输出过多时阻塞）
     try:
-        sender.wait(timeout=wait_time)
-        receiver.wait(timeout=wait_time)
-    except subprocess.TimeoutExpired:
-        print(f"Test {test_name} timed out!")
-        receiver.kill()
-        sender.kill()
+        await asyncio.wait_for(
+            asyncio.gather(sender.communicate(), receiver.communicate()),
+            timeout=wait_time
+        )
+    except asyncio.TimeoutError:
+        print(f"Test {test_name} timed out! (logs: {work_dir})")
+        for proc in (receiver, sender):
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
         return False
     
     # 检查输出文件
-    if os.path.exists('output.txt'):
-        size = os.path.getsize('output.txt')
-        print(f"Output file size: {size} bytes")
+    if os.path.exists(output_path):
+        size = os.path.getsize(output_path)
+        print(f"{test_name}: output file size: {size} bytes (logs: {work_dir})")
         return True
     else:
-        print("Output file not found!")
+        print(f"{test_name}: output file not found! (logs: {work_dir})")
         return False
 
+async def run_all(tests):
+    """并行运行所有测试（各测试使用不同端口）"""
+    for test in tests:
+        print(f"\n{'='*80}")
+        print(f"Test: {test['name']}")
+        print(f"{'='*80}")
+        print(f"Receiver: python {' '.join(test['receiver'])}")
+        print(f"Sender: python {' '.join(test['sender'])}")
+    print(f"{'='*80}\n")
+    
+    return await asyncio.gather(*(
+        run_test(test["name"], test["receiver"], test["sender"], test["wait"],
+                 os.path.join(SCRIPT_DIR, 'test_runs', f'test{i}'))
+        for i, test in enumerate(tests, 1)
+    ))
+
 def main():
     """主测试函数"""
     print("URP Protocol Test Suite")
@@ -69,6 +89,9 @@ def main():
     
     file_size = os.path.getsize(test_file)
     print(f"Test file: {test_file} ({file_size} bytes)")
+    test_file = os.path.abspath(test_file)
+    receiver = os.path.join(SCRIPT_DIR, 'receiver.py')
+    sender = os.path.join(SCRIPT_DIR, 'sender.py')
     
     # 端口配置（每次测试使用不同端口）
     base_port = 20000
@@ -76,59 +99,56 @@ def main():
     tests = [
         {
             "name": "Test 1: Stop-and-Wait over Reliable Channel",
-            "receiver": f"python receiver.py {base_port} {base_port+1} output.txt 1000",
-            "sender": f"python sender.py {base_port+1} {base_port} {test_file} 1000 0.1 0 0 0 0",
+            "receiver": [receiver, str(base_port), str(base_port+1), "output.txt", "1000"],
+            "sender": [sender, str(base_port+1), str(base_port), test_file, "1000", "0.1", "0", "0", "0", "0"],
             "wait": 15
         },
         {
             "name": "Test 2a: Stop-and-Wait with Loss (forward and reverse)",
-            "receiver": f"python receiver.py {base_port+10} {base_port+11} output.txt 1000",
-            "sender": f"python sender.py {base_port+11} {base_port+10} {test_file} 1000 0.1 0.1 0.1 0 0",
+            "receiver": [receiver, str(base_port+10), str(base_port+11), "output.txt", "1000"],
+            "sender": [sender, str(base_port+11), str(base_port+10), test_file, "1000", "0.1", "0.1", "0.1", "0", "0"],
             "wait": 30
         },
         {
             "name": "Test 2b: Stop-and-Wait with Corruption (forward and reverse)",
-            "receiver": f"python receiver.py {base_port+20} {base_port+21} output.txt 1000",
-            "sender": f"python sender.py {base_port+21} {base_port+20} {test_file} 1000 0.1 0 0 0.1 0.1",
+            "receiver": [receiver, str(base_port+20), str(base_port+21), "output.txt", "1000"],
+            "sender": [sender, str(base_port+21), str(base_port+20), test_file, "1000", "0.1", "0", "0", "0.1", "0.1"],
             "wait": 30
         },
         {
             "name": "Test 2c: Stop-and-Wait with Loss and Corruption",
-            "receiver": f"python receiver.py {base_port+30} {base_port+31} output.txt 1000",
-            "sender": f"python sender.py {base_port+31} {base_port+30} {test_file} 1000 0.1 0.05 0.05 0.02 0.02",
+            "receiver": [receiver, str(base_port+30), str(base_port+31), "output.txt", "1000"],
+            "sender": [sender, str(base_port+31), str(base_port+30), test_file, "1000", "0.1", "0.05", "0.05", "0.02", "0.02"],
             "wait": 30
         },
         {
             "name": "Test 3: Sliding Window over Reliable Channel",
-            "receiver": f"python receiver.py {base_port+40} {base_port+41} output.txt 5000",
-            "sender": f"python sender.py {base_port+41} {base_port+40} {test_file} 5000 0.1 0 0 0 0",
+            "receiver": [receiver, str(base_port+40), str(base_port+41), "output.txt", "5000"],
+            "sender": [sender, str(base_port+41), str(base_port+40), test_file, "5000", "0.1", "0", "0", "0", "0"],
             "wait": 15
         },
         {
             "name": "Test 4a: Sliding Window with Loss (forward and reverse)",
-            "receiver": f"python receiver.py {base_port+50} {base_port+51} output.txt 5000",
-            "sender": f"python sender.py {base_port+51} {base_port+50} {test_file} 5000 0.1 0.1 0.1 0 0",
+            "receiver": [receiver, str(base_port+50), str(base_port+51), "output.txt", "5000"],
+            "sender": [sender, str(base_port+51), str(base_port+50), test_file, "5000", "0.1", "0.1", "0.1", "0", "0"],
             "wait": 30
         },
         {
             "name": "Test 4b: Sliding Window with Corruption (forward and reverse)",
-            "receiver": f"python receiver.py {base_port+60} {base_port+61} output.txt 5000",
-            "sender": f"python sender.py {base_port+61} {base_port+60} {test_file} 5000 0.1 0 0 0.1 0.1",
+            "receiver": [receiver, str(base_port+60), str(base_port+61), "output.txt", "5000"],
+            "sender": [sender, str(base_port+61), str(base_port+60), test_file, "5000", "0.1", "0", "0", "0.1", "0.1"],
             "wait": 30
         },
         {
             "name": "Test 4c: Sliding Window with Loss and Corruption",
-            "receiver": f"python receiver.py {base_port+70} {base_port+71} output.txt 5000",
-            "sender": f"python sender.py {base_port+71} {base_port+70} {test_file} 5000 0.1 0.05 0.05 0.02 0.02",
+            "receiver": [receiver, str(base_port+70), str(base_port+71), "output.txt", "5000"],
+            "sender": [sender, str(base_port+71), str(base_port+70), test_file, "5000", "0.1", "0.05", "0.05", "0.02", "0.02"],
             "wait": 30
         },
     ]
     
-    results = []
-    for test in tests:
-        success = run_test(test["name"], test["receiver"], test["sender"], test["wait"])
-        results.append((test["name"], success))
-        time.sleep(2)  # 等待端口释放
+    outcomes = asyncio.run(run_all(tests))
+    results = [(test["name"], success) for test, success in zip(tests, outcomes)]
     
     # 打印结果摘要
     print(f"\n{'='*80}")
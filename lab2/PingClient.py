@@ -1,63 +1,86 @@
 import argparse
+import asyncio
 import random
-import socket
 import time
 from statistics import mean
 
+PROBES = 15
+PROBE_INTERVAL = 0.1  # seconds between probe launches, about the server's mean reply delay
+PROBE_TIMEOUT = 0.6
+
 def now_ms():
     return int(time.time() * 1000)
 
+class PingProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.waiters = {}
+
+    def datagram_received(self, data, addr):
+        # stamp on arrival so the RTT does not include scheduling delay
+        recv_time_ms = now_ms()
+        parts = data.rstrip(b"\x00").split()
+        if len(parts) < 2 or parts[0] != b"PING" or not parts[1].isdigit():
+            return
+        waiter = self.waiters.get(int(parts[1]))
+        if waiter is not None and not waiter.done():
+            waiter.set_result(recv_time_ms)
+
+async def probe(transport, protocol, i, seq):
+    await asyncio.sleep(i * PROBE_INTERVAL)
+    send_timestamp_ms = now_ms()
+    waiter = asyncio.get_running_loop().create_future()
+    protocol.waiters[seq] = waiter
+    message = f"PING {seq} {send_timestamp_ms}\r\n"
+    transport.sendto(message.encode("utf-8"))
+    try:
+        recv_time_ms = await asyncio.wait_for(waiter, PROBE_TIMEOUT)
+    # lost
+    except asyncio.TimeoutError:
+        return send_timestamp_ms, None
+    return send_timestamp_ms, recv_time_ms - send_timestamp_ms
+
+async def run_probes(server_addr, first_seq):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        PingProtocol, remote_addr=server_addr)
+    try:
+        return await asyncio.gather(*(
+            probe(transport, protocol, i, first_seq + i) for i in range(PROBES)))
+    finally:
+        transport.close()
+
 parser = argparse.ArgumentParser(description="UDP Ping Client")
 parser.add_argument("host", type=str, help="server host")
 parser.add_argument("port", type=int, help="server UDP port")
 args = parser.parse_args()
 server_addr = (args.host, args.port)
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.settimeout(0.6)
 
 seq = random.randint(40000, 50000)
 
 # count result
+probes = asyncio.run(run_probes(server_addr, seq))
+end_time_ms = now_ms()
+first_send_ms = min(send_ms for send_ms, _ in probes)
 rtts_ms = []
 results = []
-first_send_ms = None
-end_time_ms = None
-for i in range(15):
-    send_timestamp_ms = now_ms()
-    if first_send_ms is None:
-        first_send_ms = send_timestamp_ms
-    message = f"PING {seq} {send_timestamp_ms}\r\n"
-    data = message.encode("utf-8")
-    # receive
-    try:
-        sock.sendto(data, server_addr)
-        recv_data, recv_addr = sock.recvfrom(2048)
-        recv_time_ms = now_ms()
-        rtt = recv_time_ms - send_timestamp_ms
-        clean = recv_data.rstrip(b"\x00").decode("utf-8", errors="replace").strip()
+for i, (send_ms, rtt) in enumerate(probes):
+    if rtt is None:
+        results.append(f"PING to {args.host}, seq={seq + i}, rtt=timeout")
+    else:
         rtts_ms.append(rtt)
-        results.append(f"PING to {args.host}, seq={seq}, rtt={rtt} ms")
-    # lost
-    except socket.timeout:
-        results.append(f"PING to {args.host}, seq={seq}, rtt=timeout")
-    end_time_ms = now_ms()
-    seq += 1
-sock.close()
+        results.append(f"PING to {args.host}, seq={seq + i}, rtt={rtt} ms")
 for line in results:
     print(line)
 received = len(rtts_ms)
-lost = 15 - received
-packet_loss_pct = (lost / 15) * 100.0
+lost = PROBES - received
+packet_loss_pct = (lost / PROBES) * 100.0
 if received >= 1:
     min_rtt = min(rtts_ms)
     max_rtt = max(rtts_ms)
     avg_rtt = int(round(mean(rtts_ms)))
 else:
     min_rtt = max_rtt = avg_rtt = None
-if first_send_ms is not None and end_time_ms is not None:
-    total_tx_ms = end_time_ms - first_send_ms
-else:
-    total_tx_ms = 0
+total_tx_ms = end_time_ms - first_send_ms
 if received >= 2:
     diffs = [abs(rtts_ms[i] - rtts_ms[i - 1]) for i in range(1, received)]
     jitter = sum(diffs) / (received - 1)
@@ -1,15 +1,37 @@
 import socket, os, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.bind(("", 10000))
-s.listen(1)
-print("http://127.0.0.1:10000/index.html")
-print("http://127.0.0.1:10000/myimage.jpg")
-print("http://127.0.0.1:10000/myimage2.jpg")
-print("http://127.0.0.1:10000/bio.html")
+NOT_FOUND_BODY = b"<h1>404 Not Found</h1>"
+NOT_FOUND = (
+    "HTTP/1.1 404 Not Found\r\n"
+    "Content-Type: text/html\r\n"
+    f"Content-Length: {len(NOT_FOUND_BODY)}\r\n\r\n"
+).encode() + NOT_FOUND_BODY
 
-while True:
-    c, a = s.accept()
+# path -> ((st_mtime_ns, st_size), encoded response header), rebuilt when the file changes
+headers = {}
+
+def resolve(path):
+    target = os.path.join(os.getcwd(), path.lstrip("/"))
+    ext = os.path.splitext(target.lower())[1]
+    if ext not in (".html", ".jpg") or not os.path.isfile(target):
+        return None, None
+    return target, ext
+
+def response_header(path, ext, st):
+    key = (st.st_mtime_ns, st.st_size)
+    entry = headers.get(path)
+    if entry is None or entry[0] != key:
+        ctype = "text/html" if ext == ".html" else "image/jpeg"
+        header = (
+            "HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {ctype}\r\n"
+            f"Content-Length: {st.st_size}\r\n\r\n"
+        ).encode()
+        entry = headers[path] = (key, header)
+    return entry[1]
+
+def serve(c):
     while True:
         data = b""
         while b"\r\n\r\n" not in data:
@@ -24,23 +46,36 @@ while True:
         path = urllib.parse.urlsplit(t).path or "/"
         if path == "/":
             path = "/index.html"
-        target = os.path.join(os.getcwd(), path.lstrip("/"))
-        ext = os.path.splitext(target.lower())[1]
-        if ext not in (".html", ".jpg") or not os.path.isfile(target):
-            body = b"<h1>404 Not Found</h1>"
-            resp = (
-                "HTTP/1.1 404 Not Found\r\n"
-                "Content-Type: text/html\r\n"
-                f"Content-Length: {len(body)}\r\n\r\n"
-            ).encode() + body
-            c.sendall(resp)
+        target, ext = resolve(path)
+        try:
+            f = open(target, "rb") if target else None
+        except OSError:
+            f = None
+        if f is None:
+            c.sendall(NOT_FOUND)
             continue
-        with open(target, "rb") as f:
-            body = f.read()
-        ctype = "text/html" if ext == ".html" else "image/jpeg"
-        resp = (
-            "HTTP/1.1 200 OK\r\n"
-            f"Content-Type: {ctype}\r\n"
-            f"Content-Length: {len(body)}\r\n\r\n"
-        ).encode() + body
-        c.sendall(resp)
+        with f:
+            # stat the open file so the header matches the bytes sendfile sends
+            st = os.fstat(f.fileno())
+            c.sendall(response_header(path, ext, st))
+            c.sendfile(f, 0, st.st_size)
+
+def handle(c, a):
+    with c:
+        try:
+            serve(c)
+        except Exception as e:
+            print(f"Error handling {a}: {e!r}")
+
+s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+s.bind(("", 10000))
+s.listen(64)
+print("http://127.0.0.1:10000/index.html")
+print("http://127.0.0.1:10000/myimage.jpg")
+print("http://127.0.0.1:10000/myimage2.jpg")
+print("http://127.0.0.1:10000/bio.html")
+
+pool = ThreadPoolExecutor(max_workers=16)
+while True:
+    c, a = s.accept()
+    pool.submit(handle, c, a)